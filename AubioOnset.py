@@ -6,7 +6,57 @@ This replaces the librosa-based LibrosaOnset.py with aubio for more accurate ons
 
 import sys
 import os
-from aubio import source, onset
+import numpy as np
+import soundfile as sf
+from aubio import onset, float_type
+
+def read_hops(filename, hop_s):
+    """
+    Read an audio file in one pass and split it into hop-sized frames.
+    
+    Args:
+        filename: Path to audio file
+        hop_s: Hop size in samples
+    
+    Returns:
+        Tuple of (hops, samplerate) where hops is a (n_hops, hop_s) array
+    """
+    
+    samples, samplerate = sf.read(filename, dtype='float32', always_2d=True)
+    
+    # Downmix to mono, as aubio's source does for multi-channel files
+    samples = samples.mean(axis=1, dtype=np.float32)
+    
+    # Zero-pad the last hop; a trailing empty hop mirrors aubio's final short read.
+    # Rows use aubio's own sample type, so each one is passed to the detector
+    # as-is instead of being converted into a fresh vector on every hop.
+    n_hops = len(samples) // hop_s + 1
+    hops = np.zeros((n_hops, hop_s), dtype=float_type)
+    hops.reshape(-1)[:len(samples)] = samples
+    
+    return hops, samplerate
+
+def refractory_mask(times, min_wait):
+    """
+    Mark which onsets survive a minimum time separation.
+    
+    Args:
+        times: Sorted array of onset times in seconds
+        min_wait: Minimum time between kept onsets in seconds
+    
+    Returns:
+        Boolean array, True for onsets to keep
+    """
+    
+    keep = np.zeros(times.size, dtype=np.bool_)
+    last_onset = -min_wait
+    
+    for i in range(times.size):
+        if times[i] - last_onset >= min_wait:
+            keep[i] = True
+            last_onset = times[i]
+    
+    return keep
 
 def detect_onsets_aubio(filename, expected_notes=14, min_wait_frames=30):
     """
@@ -18,16 +68,15 @@ def detect_onsets_aubio(filename, expected_notes=14, min_wait_frames=30):
         min_wait_frames: Minimum frames between onsets
     
     Returns:
-        List of onset times in seconds
+        Array of onset times in seconds
     """
     
     # FFT and hop size parameters
     win_s = 512                 # fft size
     hop_s = win_s // 2          # hop size
     
-    # Open audio file
-    s = source(filename, 0, hop_s)
-    samplerate = s.samplerate
+    # Read the whole file up front so the detection loop only calls into aubio
+    hops, samplerate = read_hops(filename, hop_s)
     
     # Create onset detector with adaptive parameters
     # Use different onset detection methods based on expected notes
@@ -47,11 +96,9 @@ def detect_onsets_aubio(filename, expected_notes=14, min_wait_frames=30):
     o = onset(onset_method, win_s, hop_s, samplerate)
     o.set_threshold(threshold)
     
-    # List of onsets, in samples
-    onsets = []
-    
-    # Total number of frames read
-    total_frames = 0
+    # Onset times in seconds, stored in a preallocated array that doubles when full
+    onsets = np.empty(max(expected_notes * 4, 16), dtype=np.float64)
+    n_onsets = 0
     
     print(f"Using aubio onset detection:")
     print(f"  - Method: {onset_method}")
@@ -60,45 +107,38 @@ def detect_onsets_aubio(filename, expected_notes=14, min_wait_frames=30):
     print(f"  - Hop size: {hop_s}")
     print(f"  - Sample rate: {samplerate}")
     
-    while True:
-        samples, read = s()
+    for samples in hops:
         if o(samples):
-            onset_time = o.get_last_s()
-            print(f"Onset detected at: {onset_time:.4f}s")
-            onsets.append(onset_time)
-        total_frames += read
-        if read < hop_s: 
-            break
+            if n_onsets == onsets.size:
+                onsets = np.resize(onsets, onsets.size * 2)
+            onsets[n_onsets] = o.get_last_s()
+            n_onsets += 1
+    
+    onsets = onsets[:n_onsets]
+    print(f"Onsets detected before filtering: {n_onsets}")
     
     # Apply minimum time separation (refractory period)
     if min_wait_frames > 0:
         min_wait_seconds = min_wait_frames * hop_s / samplerate
-        filtered_onsets = []
-        last_onset = -min_wait_seconds
-        
-        for onset_time in onsets:
-            if onset_time - last_onset >= min_wait_seconds:
-                filtered_onsets.append(onset_time)
-                last_onset = onset_time
-        
-        onsets = filtered_onsets
+        onsets = onsets[refractory_mask(onsets, min_wait_seconds)]
     
     # Filter out onsets that are too close to the beginning (likely false positives)
     min_onset_time = 0.1  # Ignore onsets in the first 100ms
-    original_count = len(onsets)
-    onsets = [onset for onset in onsets if onset >= min_onset_time]
-    filtered_count = original_count - len(onsets)
-    if filtered_count > 0:
-        print(f"Filtered out {filtered_count} onsets before {min_onset_time}s (likely false positives)")
     
     # Filter out onsets beyond the expected recording duration (15 seconds)
     # This prevents detection of notes after the recording should have stopped
     max_recording_time = 15.0
-    original_count = len(onsets)
-    onsets = [onset for onset in onsets if onset <= max_recording_time]
-    filtered_count = original_count - len(onsets)
-    if filtered_count > 0:
-        print(f"Filtered out {filtered_count} onsets beyond {max_recording_time}s")
+    
+    # Onsets arrive in time order, so both filters reduce to one slice
+    first = np.searchsorted(onsets, min_onset_time, side='left')
+    last = np.searchsorted(onsets, max_recording_time, side='right')
+    
+    if first > 0:
+        print(f"Filtered out {first} onsets before {min_onset_time}s (likely false positives)")
+    if last < onsets.size:
+        print(f"Filtered out {onsets.size - last} onsets beyond {max_recording_time}s")
+    
+    onsets = onsets[first:last]
     
     return onsets
 
@@ -126,11 +166,10 @@ def main():
         onset_times = detect_onsets_aubio(audio_file, expected_notes, min_wait_frames)
         
         # Save onset times to file
-        with open('./results.beatmap.txt', 'wt') as f:
-            f.write('\n'.join(['%.4f' % onset_time for onset_time in onset_times]))
+        np.savetxt('./results.beatmap.txt', onset_times, fmt='%.4f')
         
         print(f"\nDetected {len(onset_times)} onsets (expected: {expected_notes})")
-        print(f"Onset times: {onset_times}")
+        print(f"Onset times: {onset_times.tolist()}")
         
     except Exception as e:
         print(f"Error during onset detection: {e}")
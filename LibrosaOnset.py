@@ -1,5 +1,6 @@
 import os
 import librosa
+import numpy as np
 
 def main():
     file_path = './FirstProject.wav'
@@ -10,8 +11,7 @@ def main():
     # remove extension, .mp3, .wav etc.
     file_name_no_extension, _ = os.path.splitext(file_path)
     output_name = file_name_no_extension + '.beatmap.txt'
-    with open(output_name, 'wt') as f:
-        f.write('\n'.join(['%.4f' % onset_time for onset_time in onset_times]))
+    np.savetxt(output_name, onset_times, fmt='%.4f')
 
 if __name__ == '__main__':
     main()
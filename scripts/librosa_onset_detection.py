@@ -8,6 +8,8 @@ import sys
 import json
 import librosa
 import numpy as np
+import scipy.fft
+import soundfile as sf
 import argparse
 from pathlib import Path
 
@@ -24,43 +26,78 @@ def detect_onsets_librosa(audio_file, min_db=-50.0, method='combined'):
         List of onset times in seconds
     """
     try:
-        # Load audio file
-        y, sr = librosa.load(audio_file, sr=None)
+        if method not in METHODS:
+            raise ValueError(f"Unknown method: {method}")
+        
+        # Decode with libsndfile directly; librosa.load adds audioread fallback and
+        # resampling machinery this script never uses (it always keeps the native rate)
+        y, sr = sf.read(audio_file, dtype='float32', always_2d=True)
+        
+        # Downmix to mono, as librosa.load does
+        y = y.mean(axis=1, dtype=np.float32)
+        
+        # Hand the STFT a single contiguous float32 buffer so it never has to copy or upcast
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        
+        # Onset strength envelope shared by all methods
+        onset_env = compute_onset_env(y, sr)
         
         # Convert dB to linear threshold
         min_linear = 10 ** (min_db / 20.0)
         
-        if method == 'onset':
-            return detect_onsets_only(y, sr, min_linear)
-        elif method == 'beat':
-            return detect_beats_only(y, sr, min_linear)
-        elif method == 'combined':
-            return detect_combined(y, sr, min_linear)
-        else:
-            raise ValueError(f"Unknown method: {method}")
+        return METHODS[method](y, sr, onset_env, min_linear)
             
     except Exception as e:
         print(f"Error processing {audio_file}: {e}", file=sys.stderr)
         return []
 
-def detect_onsets_only(y, sr, min_linear):
-    """Detect onsets using librosa's onset detection algorithms"""
+def compute_onset_env(y, sr):
+    """Compute the onset strength envelope that every detection method works from"""
+    
+    # librosa's STFT runs on scipy.fft; let it split transforms across every core
+    with scipy.fft.set_workers(-1):
+        return librosa.onset.onset_strength(
+            y=y, 
+            sr=sr,
+            aggregate=np.median,  # More robust than mean
+            fmax=8000,  # Focus on guitar frequency range
+            n_fft=2048,  # Power of two keeps the FFT on its fast radix-2 path
+            hop_length=512,
+            center=True
+        )
+
+def filter_by_energy(y, sr, times, min_linear, window=1024):
+    """Keep times whose following `window` samples peak above min_linear"""
     
-    # Compute onset strength envelope using multiple methods
-    onset_env = librosa.onset.onset_strength(
-        y=y, 
-        sr=sr,
-        aggregate=np.median,  # More robust than mean
-        fmax=8000,  # Focus on guitar frequency range
-        hop_length=512
-    )
+    times = np.asarray(times)
+    if len(times) == 0 or len(y) == 0:
+        return times
+    
+    starts = np.minimum((times * sr).astype(np.int64), len(y) - 1)
+    peaks = np.empty(len(starts), dtype=y.dtype)
+    
+    # Full windows: pick rows of a strided view over y into one contiguous (N, window)
+    # block, without building an (N, window) index array, and reduce it in place
+    full = starts <= len(y) - window
+    if full.any():
+        windows = np.lib.stride_tricks.sliding_window_view(y, window)[starts[full]]
+        peaks[full] = np.max(np.abs(windows, out=windows), axis=1)
+    
+    # Windows cut short by the end of the signal peak at a suffix maximum of |y|
+    tail_start = max(len(y) - window, 0)
+    suffix_peaks = np.maximum.accumulate(np.abs(y[tail_start:])[::-1])[::-1]
+    peaks[~full] = suffix_peaks[starts[~full] - tail_start]
+    
+    return times[peaks > min_linear]
+
+def detect_onsets_only(y, sr, onset_env, min_linear):
+    """Detect onsets using librosa's onset detection algorithms"""
     
     # Detect onsets with adaptive thresholding
     onset_frames = librosa.onset.onset_detect(
         onset_envelope=onset_env,
         sr=sr,
         hop_length=512,
-        units='time',
         pre_max=3,  # Look 3 frames before
         post_max=3,  # Look 3 frames after
         pre_avg=3,   # Average over 3 frames before
@@ -73,28 +110,18 @@ def detect_onsets_only(y, sr, min_linear):
     onset_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=512)
     
     # Filter by energy threshold
-    onset_times = [t for t in onset_times if np.max(np.abs(y[int(t*sr):int(t*sr)+1024])) > min_linear]
+    onset_times = filter_by_energy(y, sr, onset_times, min_linear)
     
     return onset_times.tolist()
 
-def detect_beats_only(y, sr, min_linear):
+def detect_beats_only(y, sr, onset_env, min_linear):
     """Detect beats using librosa's beat tracking"""
     
-    # Compute onset strength envelope
-    onset_env = librosa.onset.onset_strength(
-        y=y, 
-        sr=sr,
-        aggregate=np.median,
-        fmax=8000,
-        hop_length=512
-    )
-    
     # Track beats
     tempo, beat_frames = librosa.beat.beat_track(
         onset_envelope=onset_env,
         sr=sr,
         hop_length=512,
-        units='time',
         tightness=100,  # Higher = more strict tempo tracking
         trim=False
     )
@@ -103,28 +130,18 @@ def detect_beats_only(y, sr, min_linear):
     beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=512)
     
     # Filter by energy threshold
-    beat_times = [t for t in beat_times if np.max(np.abs(y[int(t*sr):int(t*sr)+1024])) > min_linear]
+    beat_times = filter_by_energy(y, sr, beat_times, min_linear)
     
     return beat_times.tolist()
 
-def detect_combined(y, sr, min_linear):
+def detect_combined(y, sr, onset_env, min_linear):
     """Combined onset and beat detection for guitar accuracy"""
     
-    # Compute onset strength envelope
-    onset_env = librosa.onset.onset_strength(
-        y=y, 
-        sr=sr,
-        aggregate=np.median,
-        fmax=8000,
-        hop_length=512
-    )
-    
     # Detect onsets
     onset_frames = librosa.onset.onset_detect(
         onset_envelope=onset_env,
         sr=sr,
         hop_length=512,
-        units='time',
         pre_max=3,
         post_max=3,
         pre_avg=3,
@@ -138,7 +155,6 @@ def detect_combined(y, sr, min_linear):
         onset_envelope=onset_env,
         sr=sr,
         hop_length=512,
-        units='time',
         tightness=80,  # Moderate strictness
         trim=False
     )
@@ -148,33 +164,41 @@ def detect_combined(y, sr, min_linear):
     beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=512)
     
     # Filter onsets by energy threshold
-    onset_times = [t for t in onset_times if np.max(np.abs(y[int(t*sr):int(t*sr)+1024])) > min_linear]
+    onset_times = filter_by_energy(y, sr, onset_times, min_linear)
     
     # If we have beats, use them to filter onsets
     if len(beat_times) > 0:
         # Find onsets that are close to beats (within 200ms)
         beat_threshold = 0.2
-        filtered_onsets = []
         
-        for onset in onset_times:
-            # Find closest beat
-            closest_beat = min(beat_times, key=lambda x: abs(x - onset))
-            if abs(closest_beat - onset) < beat_threshold:
-                filtered_onsets.append(onset)
+        # Beats are sorted, so the closest beat is one of the two neighbours
+        # of each onset's insertion point
+        pos = np.searchsorted(beat_times, onset_times)
+        left = beat_times[np.clip(pos - 1, 0, len(beat_times) - 1)]
+        right = beat_times[np.clip(pos, 0, len(beat_times) - 1)]
+        distance = np.minimum(np.abs(onset_times - left), np.abs(onset_times - right))
+        filtered_onsets = onset_times[distance < beat_threshold]
         
         # If we filtered out too many, use original onsets
         if len(filtered_onsets) < len(onset_times) * 0.3:
             return onset_times.tolist()
         else:
-            return filtered_onsets
+            return filtered_onsets.tolist()
     else:
         return onset_times.tolist()
 
+# Detection methods by name; each takes (y, sr, onset_env, min_linear)
+METHODS = {
+    'onset': detect_onsets_only,
+    'beat': detect_beats_only,
+    'combined': detect_combined,
+}
+
 def main():
     parser = argparse.ArgumentParser(description='Librosa onset detection for GuitarAccuracy')
     parser.add_argument('audio_file', help='Path to audio file')
     parser.add_argument('--min-db', type=float, default=-50.0, help='Minimum dB threshold')
-    parser.add_argument('--method', choices=['onset', 'beat', 'combined'], default='combined', 
+    parser.add_argument('--method', choices=list(METHODS), default='combined', 
                        help='Detection method')
     parser.add_argument('--output', help='Output JSON file (default: stdout)')
     